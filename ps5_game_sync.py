@@ -5,22 +5,54 @@ import os
 import json
 import time
 import ftplib
+import urllib.parse
 import urllib.request
+import base64
+import http.client
+import ssl
 import zipfile
 import io
 import hashlib
 import socket
 import logging
+import mmap
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from datetime import datetime
+from tkinter import filedialog
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None  # Artwork optimization is disabled without Pillow
 
 # --- CONFIGURATION ---
 TOOL_VERSION = "v1.2.0"
 CONFIG_FILE = "settings.json"
+CATALOG_FILE = "game_catalog.json"
+ARTWORK_CACHE_DIR = "artwork_cache"
+ARTWORK_INDEX_FILE = os.path.join(ARTWORK_CACHE_DIR, "index.json")
 DEFAULT_CONFIG = {
     "ps5_ip": "192.168.1.30",
     "ps5_ftp_port": 1337,
     "ps5_payload_port": 9021, # Default for etaHEN Elf Loader
-    "target_base_path": "/data/homebrew"
+    "target_base_path": "/data/homebrew",
+    "optimize_artwork": False,
+    "measured_bps": 0, # Upload throughput of the last sync, used for plan estimates
+    "rate_limit_kbps": 0, # Global limit for bulk (sync/push) traffic, 0 = unlimited
+    "console_rate_limit_kbps": 0, # Per-console limit for bulk traffic, 0 = unlimited
+    "quiet_hours": "", # e.g. "18:00-23:00", bulk transfers are slowed down in this window
+    "quiet_rate_kbps": 256,
+    "library_path": "", # Last PC-side folder used by Push Library
+    "push_workers": 4,
+    "github_token": "" # Optional, raises the GitHub API rate limit
+}
+
+# Max dimensions used by Itemzflow / Lightning Launcher menus
+ARTWORK_PROFILES = {
+    "icon0.png": (512, 512),
+    "pic0.png": (1280, 720),
+    "pic1.png": (1280, 720),
 }
 
 # --- GLOBAL VARS ---
@@ -108,6 +140,248 @@ async function main() {{
 }}
 """
 
+# --- TRANSFER SCHEDULER ---
+PRIORITY_INTERACTIVE = 0 # Payload injections/installs started from the GUI
+PRIORITY_BULK = 1 # Game sync traffic
+TRANSFER_BLOCK_SIZE = 64 * 1024
+
+class TokenBucket:
+    """Byte-rate limiter allowing bursts of up to one second worth of traffic."""
+    def __init__(self, rate=0):
+        self.rate = rate
+        self.tokens = rate
+        self.stamp = time.monotonic()
+
+    def set_rate(self, rate):
+        self.rate = rate
+        self.tokens = min(self.tokens, rate)
+
+    def reserve(self, nbytes):
+        """Charges nbytes and returns how long the caller should wait before sending more."""
+        if not self.rate: return 0
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        self.tokens -= nbytes
+        return max(0, -self.tokens / self.rate)
+
+def parse_quiet_hours(value):
+    """Parses "HH:MM-HH:MM" into a pair of minutes since midnight, or None."""
+    try:
+        start, end = (tuple(int(p) for p in t.strip().split(":")) for t in value.split("-"))
+        if not all(0 <= h < 24 and 0 <= m < 60 for h, m in (start, end)): return None
+        return start[0] * 60 + start[1], end[0] * 60 + end[1]
+    except: return None
+
+class TransferScheduler:
+    """Shared gate for all FTP, HTTP and payload traffic; bulk transfers are rate limited and yield to interactive ones."""
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._interactive = 0
+        self.global_bucket = TokenBucket()
+        self.quiet_bucket = TokenBucket()
+        self.console_buckets = {}
+        self.console_rate = 0
+        self.quiet_hours = None
+
+    def configure(self, cfg):
+        with self._cond:
+            self.global_bucket.set_rate(int(cfg.get("rate_limit_kbps", 0)) * 1024)
+            self.quiet_bucket.set_rate(int(cfg.get("quiet_rate_kbps", 0)) * 1024)
+            self.console_rate = int(cfg.get("console_rate_limit_kbps", 0)) * 1024
+            for bucket in self.console_buckets.values(): bucket.set_rate(self.console_rate)
+            self.quiet_hours = parse_quiet_hours(cfg.get("quiet_hours", ""))
+
+    def in_quiet_hours(self):
+        if not self.quiet_hours: return False
+        now = datetime.now()
+        minute = now.hour * 60 + now.minute
+        start, end = self.quiet_hours
+        if start <= end: return start <= minute < end
+        return minute >= start or minute < end # Window crosses midnight
+
+    @contextmanager
+    def interactive(self):
+        with self._cond: self._interactive += 1
+        try: yield
+        finally:
+            with self._cond:
+                self._interactive -= 1
+                self._cond.notify_all()
+
+    def run_interactive(self, func, *args):
+        """Thread target wrapper that holds bulk traffic back while func runs."""
+        with self.interactive(): func(*args)
+
+    def acquire(self, nbytes, host=None, priority=PRIORITY_BULK):
+        if priority != PRIORITY_BULK: return
+        with self._cond:
+            while self._interactive: self._cond.wait()
+            delay = self.global_bucket.reserve(nbytes)
+            if host:
+                bucket = self.console_buckets.setdefault(host, TokenBucket(self.console_rate))
+                delay = max(delay, bucket.reserve(nbytes))
+            if self.in_quiet_hours():
+                delay = max(delay, self.quiet_bucket.reserve(nbytes))
+        if delay: time.sleep(delay)
+
+SCHEDULER = TransferScheduler()
+
+def ftp_store(ftp, path, fileobj, priority=PRIORITY_BULK, blocksize=TRANSFER_BLOCK_SIZE):
+    ftp.storbinary(f"STOR {path}", fileobj, blocksize,
+                   callback=lambda block: SCHEDULER.acquire(len(block), ftp.host, priority))
+
+def ftp_retrieve(ftp, path, priority=PRIORITY_BULK):
+    bio = io.BytesIO()
+    def write(block):
+        SCHEDULER.acquire(len(block), ftp.host, priority)
+        bio.write(block)
+    ftp.retrbinary(f"RETR {path}", write, TRANSFER_BLOCK_SIZE)
+    return bio.getvalue()
+
+# --- HTTP CLIENT ---
+HTTP_TIMEOUT = 15
+HTTP_USER_AGENT = f"PS5SyncTool/{TOOL_VERSION}"
+
+class HTTPClient:
+    """Keep-alive HTTP(S) client shared by all GitHub API and asset downloads."""
+    MAX_REDIRECTS = 5
+    POOL_SIZE = 4
+    TOKEN_HOSTS = ("api.github.com",) # Never send the token to asset mirrors
+
+    def __init__(self, timeout=HTTP_TIMEOUT):
+        self.timeout = timeout
+        self.token = None
+        self._ssl_context = ssl.create_default_context()
+        self._pools = {}
+        self._prefetched = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def configure(self, cfg):
+        self.token = cfg.get("github_token") or None
+
+    def get(self, url, priority=PRIORITY_INTERACTIVE):
+        """Returns the body of a 200 response, following redirects. Raises on failure."""
+        with self._lock:
+            data = self._prefetched.get(url)
+            pending = self._inflight.get(url)
+        if data is not None: return data
+        if pending:
+            pending.wait(self.timeout * 4)
+            with self._lock: data = self._prefetched.get(url)
+            if data is not None: return data
+        return self._fetch(url, priority)
+
+    def prefetch(self, url):
+        if not url: return
+        with self._lock:
+            if url in self._prefetched or url in self._inflight: return
+            done = threading.Event()
+            self._inflight[url] = done
+
+        def worker():
+            try:
+                data = self._fetch(url, PRIORITY_INTERACTIVE)
+                with self._lock: self._prefetched[url] = data
+                print(f"[HTTP] Prefetched {url.rsplit('/', 1)[-1]} ({format_size(len(data))})")
+            except Exception: pass # The click will retry and report the error
+            finally:
+                with self._lock: self._inflight.pop(url, None)
+                done.set()
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _fetch(self, url, priority):
+        for _ in range(self.MAX_REDIRECTS + 1):
+            parts = urllib.parse.urlsplit(url)
+            key = (parts.scheme, parts.hostname, parts.port)
+            path = parts.path or "/"
+            if parts.query: path += "?" + parts.query
+
+            headers = {"User-Agent": HTTP_USER_AGENT, "Accept-Encoding": "identity"}
+            if parts.hostname == "api.github.com": headers["Accept"] = "application/vnd.github+json"
+            if self.token and parts.hostname in self.TOKEN_HOSTS: headers["Authorization"] = f"Bearer {self.token}"
+            proxy = self._proxy_for(parts.scheme, parts.hostname)
+            if proxy and parts.scheme == "http":
+                path = url
+                headers.update(proxy[2])
+
+            conn, resp = self._request(key, path, headers)
+            if resp.status in (301, 302, 303, 307, 308):
+                location = resp.getheader("Location")
+                resp.read()
+                self._release(key, conn, resp)
+                if not location: raise OSError(f"HTTP {resp.status} without Location for {url}")
+                url = urllib.parse.urljoin(url, location)
+                continue
+
+            try:
+                if resp.status != 200: raise OSError(f"HTTP {resp.status} {resp.reason} for {url}")
+                chunks = []
+                while True:
+                    chunk = resp.read(TRANSFER_BLOCK_SIZE)
+                    if not chunk: break
+                    SCHEDULER.acquire(len(chunk), priority=priority)
+                    chunks.append(chunk)
+            except Exception:
+                conn.close()
+                raise
+            self._release(key, conn, resp)
+            return b"".join(chunks)
+        raise OSError(f"Too many redirects for {url}")
+
+    def _request(self, key, path, headers):
+        """Sends a GET on a pooled connection, retrying once on a fresh one if the idle socket was closed."""
+        for attempt in range(2):
+            conn, reused = self._acquire(key, fresh=attempt > 0)
+            try:
+                conn.request("GET", path, headers=headers)
+                return conn, conn.getresponse()
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                if not reused or attempt: raise
+
+    def _acquire(self, key, fresh=False):
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool and not fresh: return pool.pop(), True
+        scheme, host, port = key
+        proxy = self._proxy_for(scheme, host)
+        if scheme == "https":
+            if proxy:
+                conn = http.client.HTTPSConnection(proxy[0], proxy[1], timeout=self.timeout, context=self._ssl_context)
+                conn.set_tunnel(host, port, headers=proxy[2])
+                return conn, False
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self._ssl_context), False
+        if proxy: return http.client.HTTPConnection(proxy[0], proxy[1], timeout=self.timeout), False
+        return http.client.HTTPConnection(host, port, timeout=self.timeout), False
+
+    @staticmethod
+    def _proxy_for(scheme, host):
+        """Returns (host, port, headers) of the environment proxy for this request, or None."""
+        proxy = urllib.request.getproxies().get(scheme)
+        if not proxy or urllib.request.proxy_bypass(host): return None
+        if "://" not in proxy: proxy = f"http://{proxy}"
+        parts = urllib.parse.urlsplit(proxy)
+        headers = {}
+        if parts.username:
+            creds = f"{urllib.parse.unquote(parts.username)}:{urllib.parse.unquote(parts.password or '')}"
+            headers["Proxy-Authorization"] = "Basic " + base64.b64encode(creds.encode()).decode()
+        return parts.hostname, parts.port or 8080, headers
+
+    def _release(self, key, conn, resp):
+        if resp.will_close:
+            conn.close()
+            return
+        with self._lock:
+            pool = self._pools.setdefault(key, [])
+            if len(pool) < self.POOL_SIZE:
+                pool.append(conn)
+                return
+        conn.close()
+
+HTTP_CLIENT = HTTPClient()
+
 # --- LOGIC HELPERS ---
 def load_config():
     if not os.path.exists(CONFIG_FILE):
@@ -141,21 +415,29 @@ def calculate_bytes_md5(data_bytes):
     return hash_md5.hexdigest()
 
 def fetch_json(url):
-    try:
-        req = urllib.request.Request(url, headers={'User-Agent': 'PS5SyncTool'})
-        with urllib.request.urlopen(req) as resp:
-            return json.loads(resp.read().decode())
+    try: return json.loads(HTTP_CLIENT.get(url).decode())
     except: return None
 
+def latest_asset_url(releases, match):
+    """Download URL of the first asset accepted by match(name) in the newest release that has one."""
+    for release in releases or []:
+        url = next((a['browser_download_url'] for a in release.get('assets', []) if match(a['name'])), None)
+        if url: return url
+    return None
+
 def format_datetime(iso_str):
     try: return iso_str.replace('T', ' ').replace('Z', '')[:16]
     except: return iso_str
 
-def download_file_to_memory(url):
+def format_size(num_bytes):
+    for unit in ("B", "KB", "MB"):
+        if num_bytes < 1024: return f"{num_bytes:.0f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} GB"
+
+def download_file_to_memory(url, priority=PRIORITY_INTERACTIVE):
     try:
-        with urllib.request.urlopen(url) as response:
-            if response.status == 200:
-                return response.read()
+        return HTTP_CLIENT.get(url, priority)
     except Exception as e:
         print(f"[ERR] Download failed: {e}")
     return None
@@ -165,7 +447,11 @@ def inject_payload(ip, port, data_bytes):
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             s.settimeout(5)
             s.connect((ip, port))
-            s.sendall(data_bytes)
+            view = memoryview(data_bytes)
+            for offset in range(0, len(view), TRANSFER_BLOCK_SIZE):
+                block = view[offset:offset + TRANSFER_BLOCK_SIZE]
+                SCHEDULER.acquire(len(block), ip, PRIORITY_INTERACTIVE)
+                s.sendall(block)
         return True
     except Exception as e:
         print(f"[INJECT ERR] {e}")
@@ -179,6 +465,344 @@ def check_port_open(ip, port):
     except:
         return False
 
+# --- FTP PIPELINING ---
+class FTPPipeline:
+    """Writes control commands (SIZE, MDTM, MKD...) back-to-back and reads the replies in order."""
+    WINDOW = 32
+    PROBE_TIMEOUT = 3
+    capabilities = {} # (host, port) -> bool, remembered for the whole session
+
+    def __init__(self, ftp, reconnect=None):
+        self.ftp = ftp
+        self.reconnect = reconnect
+        self.key = (ftp.host, ftp.port)
+
+    @property
+    def supported(self):
+        return self.capabilities.get(self.key)
+
+    def probe(self):
+        """Returns False if the server can't pipeline, after switching to a fresh lockstep connection."""
+        if self.supported is not None: return self.supported
+        old_timeout = self.ftp.sock.gettimeout()
+        try:
+            self.ftp.sock.settimeout(self.PROBE_TIMEOUT)
+            self.ftp.sock.sendall(b"NOOP\r\nNOOP\r\n")
+            ok = all(self.ftp.getmultiline()[:1] == "2" for _ in range(2))
+        except Exception: ok = False
+        finally:
+            try: self.ftp.sock.settimeout(old_timeout)
+            except: pass
+        self.capabilities[self.key] = ok
+        if not ok:
+            print("[FTP] Server does not support command pipelining, using lockstep mode.")
+            self._reopen()
+        return ok
+
+    def run(self, commands):
+        """Returns the raw reply of each command, errors included (e.g. "550 ...")."""
+        for cmd in commands:
+            if "\r" in cmd or "\n" in cmd: raise ValueError("an illegal newline character should not be contained")
+
+        replies = []
+        i = 0
+        while i < len(commands):
+            if not self.supported:
+                for cmd in commands[i:]:
+                    self.ftp.putcmd(cmd)
+                    replies.append(self.ftp.getmultiline())
+                return replies
+
+            window = commands[i:i + self.WINDOW]
+            try:
+                self.ftp.sock.sendall("".join(f"{c}\r\n" for c in window).encode(self.ftp.encoding))
+                window_replies = [self.ftp.getmultiline() for _ in window]
+            except Exception as e:
+                # Unread replies would shift every later answer, so never reuse this socket
+                print(f"[FTP] Pipelining failed ({e}), reconnecting in lockstep mode.")
+                self.capabilities[self.key] = False
+                self._reopen()
+                continue # Re-run the same window in lockstep
+            replies.extend(window_replies)
+            i += len(window)
+        return replies
+
+    def keepalive(self):
+        """Sends a NOOP so an idle control connection isn't dropped, reconnecting if it already was."""
+        try: self.ftp.voidcmd("NOOP")
+        except Exception: self._reopen()
+
+    def _reopen(self):
+        try: self.ftp.close()
+        except: pass
+        ftp = self.reconnect() if self.reconnect else None
+        if not ftp: raise ConnectionError("FTP reconnect failed")
+        self.ftp = ftp
+
+    def sizes(self, paths):
+        """SIZE for every path, None where the file is missing."""
+        if not paths: return []
+        # NLST leaves the connection in ASCII mode, where some servers refuse SIZE
+        replies = self.run(["TYPE I"] + [f"SIZE {p}" for p in paths])[1:]
+        return [int(r[4:].strip()) if r.startswith("213") else None for r in replies]
+
+    def mdtms(self, paths):
+        """Raw MDTM timestamp for every path, None where unsupported or missing."""
+        return [r[4:].strip() if r.startswith("213") else None for r in self.run([f"MDTM {p}" for p in paths])]
+
+# --- ARTWORK ---
+def optimize_artwork(img_name, data_bytes):
+    """Returns launcher-sized artwork for a shortcut (or the original bytes), cached on disk by source hash."""
+    if Image is None or img_name not in ARTWORK_PROFILES: return data_bytes
+
+    max_w, max_h = ARTWORK_PROFILES[img_name]
+    cache_path = os.path.join(ARTWORK_CACHE_DIR, f"{calculate_bytes_md5(data_bytes)}_{max_w}x{max_h}.png")
+    if os.path.exists(cache_path):
+        with open(cache_path, "rb") as f:
+            return f.read()
+
+    try:
+        with Image.open(io.BytesIO(data_bytes)) as img:
+            img.thumbnail((max_w, max_h), Image.LANCZOS)
+            if img.mode not in ("RGB", "RGBA"): img = img.convert("RGBA")
+            out = io.BytesIO()
+            img.save(out, format="PNG", optimize=True)
+            result = out.getvalue()
+    except Exception as e:
+        print(f"[ART ERR] {img_name}: {e}")
+        return data_bytes
+
+    if len(result) >= len(data_bytes): result = data_bytes
+    try:
+        os.makedirs(ARTWORK_CACHE_DIR, exist_ok=True)
+        with open(cache_path, "wb") as f:
+            f.write(result)
+    except: pass
+    return result
+
+def load_artwork_index():
+    """Maps "source path|source size" to the size of the optimized image last uploaded for it."""
+    try:
+        with open(ARTWORK_INDEX_FILE, 'r') as f:
+            return json.load(f)
+    except: return {}
+
+def save_artwork_index(index):
+    try:
+        os.makedirs(ARTWORK_CACHE_DIR, exist_ok=True)
+        with open(ARTWORK_INDEX_FILE, 'w') as f:
+            json.dump(index, f, indent=4)
+    except Exception as e:
+        print(f"[ART ERR] {e}")
+
+# --- PUSH LIBRARY ---
+PUSH_BLOCK_SIZE = 1024 * 1024
+PUSH_MANIFEST = ".sync_manifest.json"
+PUSH_KEEPALIVE = 30 # Seconds between NOOPs on the control connection while workers upload
+
+def find_local_games(root):
+    """Returns game folders (containing sce_sys/param.json) at or directly below root."""
+    if os.path.isfile(os.path.join(root, "sce_sys", "param.json")): return [root]
+    try: names = sorted(os.listdir(root))
+    except OSError: return []
+    return [os.path.join(root, n) for n in names if os.path.isfile(os.path.join(root, n, "sce_sys", "param.json"))]
+
+def list_local_files(game_dir):
+    """Returns (relative posix path, size, mtime) for every file of a local game folder."""
+    files = []
+    for dirpath, _, filenames in os.walk(game_dir):
+        for fname in filenames:
+            full = os.path.join(dirpath, fname)
+            rel = os.path.relpath(full, game_dir).replace(os.sep, "/")
+            if rel == PUSH_MANIFEST: continue
+            st = os.stat(full)
+            files.append((rel, st.st_size, int(st.st_mtime)))
+    return files
+
+def calculate_mmap_md5(filepath):
+    hash_md5 = hashlib.md5()
+    if os.path.getsize(filepath) > 0:
+        with open(filepath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            hash_md5.update(mm)
+    return hash_md5.hexdigest()
+
+def ftp_store_file(ftp, path, filepath, priority=PRIORITY_BULK):
+    """Uploads a local file straight from an mmap and returns the MD5 of the bytes sent."""
+    hash_md5 = hashlib.md5()
+    def on_block(block):
+        hash_md5.update(block)
+        SCHEDULER.acquire(len(block), ftp.host, priority)
+
+    if os.path.getsize(filepath) == 0:
+        ftp.storbinary(f"STOR {path}", io.BytesIO(b""), callback=on_block)
+    else:
+        with open(filepath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            ftp.storbinary(f"STOR {path}", mm, PUSH_BLOCK_SIZE, callback=on_block)
+    return hash_md5.hexdigest()
+
+# --- SYNC PLAN ---
+SMALL_FILE_LIMIT = 256 * 1024
+SHORTCUT_FILES = ["dump_runner.elf", "payload_version.json", "homebrew.js", "icon0.png", "pic1.png", "pic0.png"]
+
+class SyncPlan:
+    """Everything a sync will do, gathered before anything is written to the console."""
+    def __init__(self):
+        self.games = []
+        self.mkdirs = []
+        self.uploads = []
+        self.up_to_date = []
+        self.stale = []
+
+    def add_upload(self, path, size, action, data=None, local=None, src=None, requires=None):
+        self.uploads.append({"path": path, "size": size, "action": action,
+                             "data": data, "local": local, "src": src, "requires": requires})
+
+    def batches(self):
+        markers = [u for u in self.uploads if u["requires"]]
+        files = [u for u in self.uploads if not u["requires"]]
+        small = sorted((u for u in files if u["size"] < SMALL_FILE_LIMIT), key=lambda u: u["path"])
+        large = sorted((u for u in files if u["size"] >= SMALL_FILE_LIMIT), key=lambda u: u["path"])
+        return [("small files", small), ("large files", large), ("version markers", markers)]
+
+    def total_bytes(self):
+        return sum(u["size"] for u in self.uploads)
+
+    def estimate_seconds(self, bytes_per_sec):
+        if not bytes_per_sec: return None
+        return self.total_bytes() / bytes_per_sec
+
+    def describe(self, bytes_per_sec=0):
+        """Returns the plan as dry-run diff lines (+ create, ~ update, - stale)."""
+        lines = [f"[PLAN] {len(self.games)} games | {len(self.mkdirs)} dirs to create | "
+                 f"{len(self.uploads)} files to write ({format_size(self.total_bytes())}) | "
+                 f"{len(self.up_to_date)} files up to date | {len(self.stale)} stale shortcuts"]
+        for path in self.mkdirs: lines.append(f"  + {path}/")
+        for up in sorted(self.uploads, key=lambda u: u["path"]):
+            mark = "+" if up["action"] == "create" else "~"
+            lines.append(f"  {mark} {up['path']} ({format_size(up['size'])})")
+        for path in self.stale: lines.append(f"  - {path}/ (source dump not found)")
+
+        eta = self.estimate_seconds(bytes_per_sec)
+        if eta is not None: lines.append(f"[PLAN] Estimated transfer time: ~{eta:.0f}s at {format_size(bytes_per_sec)}/s")
+        elif self.uploads: lines.append("[PLAN] Estimated transfer time: unknown (no previous sync measured)")
+        return lines
+
+# --- GAME CATALOG ---
+def parse_param_json(data_bytes):
+    """Extracts the fields the tool cares about from a game's sce_sys/param.json."""
+    try: param = json.loads(data_bytes.decode('utf-8-sig'))
+    except: return None
+    if not isinstance(param, dict): return None
+
+    localized = param.get('localizedParameters') or {}
+    names = {lang: values['titleName'] for lang, values in localized.items()
+             if isinstance(values, dict) and values.get('titleName')}
+
+    # Same preference order as JS_TEMPLATE, with the dump's default language first
+    title = names.get(localized.get('defaultLanguage', ''))
+    if not title: title = next((n for lang, n in names.items() if lang.startswith('en-')), None)
+    if not title: title = next(iter(names.values()), '')
+
+    return {
+        "title_id": param.get('titleId', ''),
+        "content_id": param.get('contentId', ''),
+        "title_name": title,
+        "names": names,
+        "version": param.get('contentVersion') or param.get('masterVersion', ''),
+    }
+
+def ftp_dir_size(ftp, path, priority=PRIORITY_BULK):
+    """Total size of the files below a remote directory, from recursive LIST output."""
+    lines = []
+    def collect(line):
+        SCHEDULER.acquire(len(line), ftp.host, priority)
+        lines.append(line)
+    ftp.retrlines(f"LIST {path}", collect)
+    total = 0
+    for line in lines:
+        parts = line.split(None, 8)
+        if len(parts) < 9 or parts[8] in (".", ".."): continue
+        if line.startswith("d"): total += ftp_dir_size(ftp, f"{path}/{parts[8]}", priority)
+        elif line.startswith("-"): total += int(parts[4])
+    return total
+
+class GameCatalog:
+    """Local cache of parsed param.json data, keyed by the game's source path."""
+    def __init__(self, path=CATALOG_FILE):
+        self.path = path
+        self.entries = {}
+        self._search_index = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get("games", {})
+        except: self.entries = {}
+        self._reindex()
+
+    def save(self):
+        with self._lock:
+            data = {"tool_version": TOOL_VERSION, "games": self.entries}
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=4, ensure_ascii=False)
+        except Exception as e:
+            print(f"[CATALOG ERR] {e}")
+
+    def is_fresh(self, src_path, param_size, param_mdtm):
+        entry = self.entries.get(src_path)
+        return bool(entry) and entry.get("param_size") == param_size and entry.get("param_mdtm") == param_mdtm
+
+    def update(self, src_path, game_name, param_size, param_mdtm, info):
+        entry = dict(info, folder=game_name, path=src_path, param_size=param_size, param_mdtm=param_mdtm)
+        with self._lock:
+            self.entries[src_path] = entry
+            self._search_index[src_path] = self._search_text(entry)
+
+    def unsized(self):
+        with self._lock:
+            return [p for p, e in self.entries.items() if not e.get("game_size")]
+
+    def set_size(self, src_path, size):
+        with self._lock:
+            if src_path in self.entries: self.entries[src_path]["game_size"] = size
+
+    def prune(self, seen_paths):
+        """Drops games that were not found during the last full scan."""
+        with self._lock:
+            for src_path in [p for p in self.entries if p not in seen_paths]:
+                del self.entries[src_path]
+                self._search_index.pop(src_path, None)
+
+    def duplicates(self):
+        """Maps title IDs present in more than one location to their paths."""
+        by_title = {}
+        with self._lock:
+            for src_path, entry in self.entries.items():
+                if entry.get("title_id"): by_title.setdefault(entry["title_id"], []).append(src_path)
+        return {tid: sorted(paths) for tid, paths in by_title.items() if len(paths) > 1}
+
+    def search(self, query="", duplicates_only=False):
+        terms = query.lower().split()
+        dupes = self.duplicates() if duplicates_only else None
+        with self._lock:
+            results = [entry for src_path, entry in self.entries.items()
+                       if all(t in self._search_index.get(src_path, "") for t in terms)
+                       and (dupes is None or entry.get("title_id") in dupes)]
+        return sorted(results, key=lambda e: (e.get("title_name") or e.get("folder", "")).lower())
+
+    def _reindex(self):
+        with self._lock:
+            self._search_index = {p: self._search_text(e) for p, e in self.entries.items()}
+
+    @staticmethod
+    def _search_text(entry):
+        parts = [entry.get("title_id", ""), entry.get("content_id", ""), entry.get("folder", ""), entry.get("path", "")]
+        parts.extend(entry.get("names", {}).values())
+        return " ".join(parts).lower()
+
 # --- GUI CLASSES ---
 
 class ConsoleRedirector:
@@ -256,6 +880,8 @@ class PayloadUpdateWindow(ctk.CTkToplevel):
 
         # --- RELEASES CARDS ---
         if releases_data:
+            # Latest release, most likely to be installed
+            HTTP_CLIENT.prefetch(latest_asset_url(releases_data, lambda n: n.endswith('.zip') or n.endswith('.elf')))
             for release in releases_data:
                 tag = release.get('tag_name', 'v?')
                 name = release.get('name', tag)
@@ -288,7 +914,7 @@ class PayloadUpdateWindow(ctk.CTkToplevel):
 
     def download_and_install(self, url, label, date):
         self.status_lbl.configure(text=f"Downloading {label}...", text_color="orange")
-        threading.Thread(target=self._worker_install, args=(url, label, date), daemon=True).start()
+        threading.Thread(target=SCHEDULER.run_interactive, args=(self._worker_install, url, label, date), daemon=True).start()
 
     def _worker_install(self, url, label, date):
         try:
@@ -355,6 +981,8 @@ class KstuffManagerWindow(ctk.CTkToplevel):
             
         self.status_lbl.configure(text=f"Found {len(releases)} releases.", text_color="gray")
 
+        # Latest release, most likely to be installed
+        HTTP_CLIENT.prefetch(latest_asset_url(releases, lambda n: n.endswith('.elf') or n.endswith('.bin')))
         for release in releases:
             if not self.winfo_exists(): return
 
@@ -388,7 +1016,7 @@ class KstuffManagerWindow(ctk.CTkToplevel):
             except Exception: return
 
     def ftp_install(self, url, tag):
-        threading.Thread(target=self._worker_install, args=(url, tag), daemon=True).start()
+        threading.Thread(target=SCHEDULER.run_interactive, args=(self._worker_install, url, tag), daemon=True).start()
 
     def _worker_install(self, url, tag):
         self.status_lbl.configure(text=f"Downloading {tag}...", text_color="orange")
@@ -408,7 +1036,7 @@ class KstuffManagerWindow(ctk.CTkToplevel):
             
             remote_path = f"{remote_dir}/kstuff.elf"
             print(f"\n[FTP] Uploading kstuff.elf to {remote_path}...")
-            ftp.storbinary(f"STOR {remote_path}", io.BytesIO(bin_data))
+            ftp_store(ftp, remote_path, io.BytesIO(bin_data), PRIORITY_INTERACTIVE)
             ftp.quit()
             
             print(f"[FTP] Installed Kstuff {tag}. REBOOT PS5!")
@@ -452,6 +1080,9 @@ class ShadowMountWindow(ctk.CTkToplevel):
             
         self.status_lbl.configure(text=f"Found {len(releases)} releases.", text_color="gray")
 
+        # Latest release, most likely to be injected/installed
+        HTTP_CLIENT.prefetch(latest_asset_url(releases, lambda n: n.lower() == 'shadowmount.elf'))
+        HTTP_CLIENT.prefetch(latest_asset_url(releases, lambda n: n.lower() == 'notify.elf'))
         for release in releases:
             if not self.winfo_exists(): return
             tag = release.get('tag_name', 'Unknown')
@@ -492,7 +1123,7 @@ class ShadowMountWindow(ctk.CTkToplevel):
             btn_install.pack(side="right", padx=5)
 
     def sequence_inject(self, url_notify, url_shadow, tag):
-        threading.Thread(target=self._worker_inject, args=(url_notify, url_shadow, tag), daemon=True).start()
+        threading.Thread(target=SCHEDULER.run_interactive, args=(self._worker_inject, url_notify, url_shadow, tag), daemon=True).start()
 
     def _worker_inject(self, url_notify, url_shadow, tag):
         self.status_lbl.configure(text=f"Downloading {tag}...", text_color="orange")
@@ -523,7 +1154,7 @@ class ShadowMountWindow(ctk.CTkToplevel):
             self.status_lbl.configure(text="Failed to send Notify.", text_color="red")
 
     def ftp_install(self, url_shadow, tag):
-        threading.Thread(target=self._worker_install, args=(url_shadow, tag), daemon=True).start()
+        threading.Thread(target=SCHEDULER.run_interactive, args=(self._worker_install, url_shadow, tag), daemon=True).start()
 
     def _worker_install(self, url_shadow, tag):
         self.status_lbl.configure(text=f"Installing {tag}...", text_color="orange")
@@ -542,7 +1173,7 @@ class ShadowMountWindow(ctk.CTkToplevel):
             except: pass
             
             print(f"\n[FTP] Uploading shadowmount.elf to {remote_dir}...")
-            ftp.storbinary(f"STOR {remote_dir}/shadowmount.elf", io.BytesIO(bin_shadow))
+            ftp_store(ftp, f"{remote_dir}/shadowmount.elf", io.BytesIO(bin_shadow), PRIORITY_INTERACTIVE)
             ftp.quit()
             
             print("[FTP] Install Complete.")
@@ -557,6 +1188,9 @@ class PS5SyncApp(ctk.CTk):
     def __init__(self):
         super().__init__()
         self.cfg = load_config()
+        SCHEDULER.configure(self.cfg)
+        HTTP_CLIENT.configure(self.cfg)
+        self.catalog = GameCatalog()
 
         self.title(f"PS5 Dump Game Sync Tool {TOOL_VERSION}")
         self.geometry("850x650")
@@ -568,6 +1202,7 @@ class PS5SyncApp(ctk.CTk):
         self.tabview = ctk.CTkTabview(self)
         self.tabview.pack(fill="both", expand=True, padx=20, pady=10)
         self.tab_dash = self.tabview.add("Dashboard")
+        self.tab_library = self.tabview.add("Library")
         self.tab_settings = self.tabview.add("Settings")
         self.tab_console = self.tabview.add("Console Log")
 
@@ -587,7 +1222,19 @@ class PS5SyncApp(ctk.CTk):
         
         self.btn_sync = ctk.CTkButton(self.frame_main, text="START GAME SYNC", font=("Roboto", 20, "bold"), height=80, 
                                       fg_color="#1f6aa5", hover_color="#144870", command=self.start_sync_thread)
-        self.btn_sync.pack(fill="x", padx=40, pady=(40, 20))
+        self.btn_sync.pack(fill="x", padx=40, pady=(40, 10))
+
+        self.frame_sync_opts = ctk.CTkFrame(self.frame_main, fg_color="transparent")
+        self.frame_sync_opts.pack(fill="x", padx=40)
+        self.btn_dry_run = ctk.CTkButton(self.frame_sync_opts, text="Dry Run (Show Plan)", width=160, fg_color="#444",
+                                         command=lambda: self.start_sync_thread(dry_run=True))
+        self.btn_dry_run.pack(side="left")
+        self.btn_push = ctk.CTkButton(self.frame_sync_opts, text="Push Library from PC", width=160, fg_color="#444",
+                                      command=self.start_push_thread)
+        self.btn_push.pack(side="left", padx=10)
+        self.var_prune = ctk.BooleanVar(value=False)
+        self.chk_prune = ctk.CTkCheckBox(self.frame_sync_opts, text="Remove stale shortcuts", variable=self.var_prune)
+        self.chk_prune.pack(side="right")
         
         self.progress = ctk.CTkProgressBar(self.frame_main)
         self.progress.pack(fill="x", padx=40, pady=10)
@@ -609,6 +1256,24 @@ class PS5SyncApp(ctk.CTk):
         self.btn_shadow = ctk.CTkButton(self.frame_updates, text="ShadowMount\nCenter", command=self.open_shadow_center, fg_color="#E0A800", text_color="black", hover_color="#C69500")
         self.btn_shadow.pack(side="left", fill="x", expand=True, padx=5)
 
+        # --- LIBRARY ---
+        self.frame_search = ctk.CTkFrame(self.tab_library, fg_color="transparent")
+        self.frame_search.pack(fill="x", pady=(10, 5), padx=5)
+        self.entry_search = ctk.CTkEntry(self.frame_search, placeholder_text="Search title, Title ID, folder...")
+        self.entry_search.pack(side="left", fill="x", expand=True, padx=(0, 10))
+        self.entry_search.bind("<KeyRelease>", lambda e: self.refresh_library())
+        self.var_dupes = ctk.BooleanVar(value=False)
+        self.chk_dupes = ctk.CTkCheckBox(self.frame_search, text="Duplicates only", variable=self.var_dupes, command=self.refresh_library)
+        self.chk_dupes.pack(side="right")
+        self.btn_sizes = ctk.CTkButton(self.frame_search, text="Measure Sizes", width=120, command=self.start_size_thread)
+        self.btn_sizes.pack(side="right", padx=(0, 10))
+
+        self.txt_library = ctk.CTkTextbox(self.tab_library, font=("Consolas", 11), wrap="none")
+        self.txt_library.pack(fill="both", expand=True, padx=5, pady=5)
+        self.lbl_library = ctk.CTkLabel(self.tab_library, text="", text_color="gray")
+        self.lbl_library.pack(pady=(0, 5))
+        self.refresh_library()
+
         # --- SETTINGS ---
         self.lbl_ip = ctk.CTkLabel(self.tab_settings, text="PS5 IP Address:", font=("Roboto", 14))
         self.lbl_ip.pack(pady=(20, 5))
@@ -628,6 +1293,22 @@ class PS5SyncApp(ctk.CTk):
         self.entry_port_pl.pack(pady=5)
         self.entry_port_pl.insert(0, str(self.cfg.get("ps5_payload_port", 9021)))
 
+        self.frame_limits = ctk.CTkFrame(self.tab_settings, fg_color="transparent")
+        self.frame_limits.pack(pady=(15, 5))
+        ctk.CTkLabel(self.frame_limits, text="Bulk Limit (KB/s, 0 = off):", font=("Roboto", 14)).pack(side="left", padx=5)
+        self.entry_rate = ctk.CTkEntry(self.frame_limits, width=80, justify="center")
+        self.entry_rate.pack(side="left", padx=5)
+        self.entry_rate.insert(0, str(self.cfg.get("rate_limit_kbps", 0)))
+        ctk.CTkLabel(self.frame_limits, text="Quiet Hours:", font=("Roboto", 14)).pack(side="left", padx=(15, 5))
+        self.entry_quiet = ctk.CTkEntry(self.frame_limits, width=110, justify="center", placeholder_text="18:00-23:00")
+        self.entry_quiet.pack(side="left", padx=5)
+        if self.cfg.get("quiet_hours"): self.entry_quiet.insert(0, self.cfg["quiet_hours"])
+
+        self.var_optimize_art = ctk.BooleanVar(value=self.cfg.get("optimize_artwork", False))
+        self.chk_optimize_art = ctk.CTkCheckBox(self.tab_settings, text="Optimize shortcut artwork (requires Pillow)", variable=self.var_optimize_art)
+        self.chk_optimize_art.pack(pady=(20, 5))
+        if Image is None: self.chk_optimize_art.configure(state="disabled")
+
         self.btn_save = ctk.CTkButton(self.tab_settings, text="Save Settings", width=150, fg_color="green", command=self.save_settings)
         self.btn_save.pack(pady=30)
 
@@ -651,9 +1332,54 @@ class PS5SyncApp(ctk.CTk):
         self.cfg["ps5_ip"] = self.entry_ip.get()
         self.cfg["ps5_ftp_port"] = int(self.entry_port.get())
         self.cfg["ps5_payload_port"] = int(self.entry_port_pl.get())
+        self.cfg["optimize_artwork"] = self.var_optimize_art.get()
+        self.cfg["rate_limit_kbps"] = int(self.entry_rate.get() or 0)
+        quiet = self.entry_quiet.get().strip()
+        if quiet and not parse_quiet_hours(quiet):
+            print("[CFG] Invalid quiet hours, expected HH:MM-HH:MM. Keeping the previous value.")
+            self.entry_quiet.delete(0, "end")
+            self.entry_quiet.insert(0, self.cfg.get("quiet_hours", ""))
+        else: self.cfg["quiet_hours"] = quiet
         save_config(self.cfg)
+        SCHEDULER.configure(self.cfg)
         print("[CFG] Settings saved.")
 
+    def refresh_library(self):
+        results = self.catalog.search(self.entry_search.get(), self.var_dupes.get())
+        dupes = self.catalog.duplicates()
+
+        lines = []
+        for entry in results:
+            mark = "⚠" if entry.get("title_id") in dupes else " "
+            title = entry.get("title_name") or entry.get("folder", "")
+            size = format_size(entry["game_size"]) if entry.get("game_size") else "?"
+            lines.append(f"{mark} {entry.get('title_id', ''):<10} {title[:40]:<40} {entry.get('version', ''):<10} {size:>9}  {entry.get('path', '')}")
+
+        self.txt_library.configure(state="normal")
+        self.txt_library.delete("0.0", "end")
+        self.txt_library.insert("0.0", "\n".join(lines))
+        self.txt_library.configure(state="disabled")
+        self.lbl_library.configure(text=f"{len(results)} of {len(self.catalog.entries)} games | {len(dupes)} duplicate title IDs")
+
+    def start_size_thread(self):
+        self.btn_sizes.configure(state="disabled")
+        threading.Thread(target=self._logic_sizes, daemon=True).start()
+
+    def _logic_sizes(self):
+        """Walks the folders of catalog games without a known size, outside the sync scan."""
+        pending = self.catalog.unsized()
+        ftp = self._connect_ftp() if pending else None
+        if ftp:
+            print(f"[CATALOG] Measuring {len(pending)} games...")
+            for src_path in pending:
+                try: self.catalog.set_size(src_path, ftp_dir_size(ftp, src_path))
+                except Exception as e: print(f"[CATALOG] Could not measure {src_path}: {e}")
+            try: ftp.quit()
+            except: pass
+            self.catalog.save()
+            self.refresh_library()
+        self.btn_sizes.configure(state="normal")
+
     def open_payload_manager(self): PayloadUpdateWindow(self)
     
     def open_kstuff_manager(self):
@@ -669,23 +1395,45 @@ class PS5SyncApp(ctk.CTk):
     
     def check_connection_gui(self): threading.Thread(target=self._logic_check_conn, daemon=True).start()
 
-    def start_sync_thread(self):
+    def start_sync_thread(self, dry_run=False):
         if not os.path.exists("dump_runner.elf"):
             print("[ERR] Missing dump_runner.elf! Download it first.")
             self.tabview.set("Console Log")
             return
         
         # Reset GUI
-        self.btn_sync.configure(state="disabled", text="SYNCING...")
+        self.btn_sync.configure(state="disabled", text="PLANNING..." if dry_run else "SYNCING...")
+        self.btn_dry_run.configure(state="disabled")
+        self.btn_push.configure(state="disabled")
         self.progress.configure(mode="indeterminate")
         self.lbl_sync_status.configure(text="") # Clear previous status
         self.progress.start()
         
-        threading.Thread(target=self._logic_sync, daemon=True).start()
+        threading.Thread(target=self._logic_sync, args=(dry_run,), daemon=True).start()
 
-    def _connect_ftp(self):
-        ip = self.entry_ip.get()
-        port = int(self.entry_port.get())
+    def start_push_thread(self):
+        if not os.path.exists("dump_runner.elf"):
+            print("[ERR] Missing dump_runner.elf! Download it first.")
+            self.tabview.set("Console Log")
+            return
+
+        root = filedialog.askdirectory(title="Select game folder or library folder", initialdir=self.cfg.get("library_path") or None)
+        if not root: return
+        self.cfg["library_path"] = root
+        save_config(self.cfg)
+
+        self.btn_sync.configure(state="disabled", text="PUSHING...")
+        self.btn_dry_run.configure(state="disabled")
+        self.btn_push.configure(state="disabled")
+        self.progress.configure(mode="indeterminate")
+        self.lbl_sync_status.configure(text="")
+        self.progress.start()
+
+        threading.Thread(target=self._logic_push, args=(root,), daemon=True).start()
+
+    def _connect_ftp(self, ip=None, port=None):
+        ip = ip or self.entry_ip.get()
+        port = port or int(self.entry_port.get())
 
         try:
             ftp = ftplib.FTP()
@@ -721,17 +1469,55 @@ class PS5SyncApp(ctk.CTk):
             print(f"[CONN] Failed to connect to {ip}")
 
     # --- SYNC LOGIC ---
-    def _logic_sync(self):
-        print("\n--- STARTING SYNC ---")
+    def _logic_sync(self, dry_run=False):
+        print("\n--- STARTING DRY RUN ---" if dry_run else "\n--- STARTING SYNC ---")
         self.check_connection_gui()
         
-        ftp = self._connect_ftp()
-        if not ftp: self._stop_sync_ui(); return
+        pipe = self._open_pipeline()
+        if not pipe: self._stop_sync_ui(); return
 
-        target_base = self.cfg['target_base_path']
+        try:
+            found_games = self._scan_games(pipe)
+            plan = self._plan_sync(pipe, found_games, self.cfg['target_base_path'])
+            for line in plan.describe(self.cfg.get("measured_bps", 0)): print(line)
+            failures = 0 if dry_run else self._execute_plan(pipe, plan, prune_stale=self.var_prune.get())
+        except Exception as e:
+            print(f"[ERR] Sync aborted: {e}")
+            self._stop_sync_ui()
+            return
+        finally:
+            try: pipe.ftp.quit()
+            except: pass
+
+        if dry_run:
+            self._stop_sync_ui(success=True, message=f"Dry run: {len(plan.uploads)} files, {format_size(plan.total_bytes())} to write")
+            return
+        if failures:
+            print(f"[DONE] Sync finished with {failures} failed files.")
+            self._stop_sync_ui(success=False, message=f"❌ {failures} files failed to sync (check console)")
+            return
+        print("[DONE] Sync Complete.")
+        self._stop_sync_ui(success=True)
+
+    def _open_pipeline(self):
+        """Connects and probes pipelining. Returns an FTPPipeline that can reconnect itself, or None."""
+        ip = self.entry_ip.get()
+        port = int(self.entry_port.get())
+        ftp = self._connect_ftp(ip, port)
+        if not ftp: return None
+
+        pipe = FTPPipeline(ftp, reconnect=lambda: self._connect_ftp(ip, port))
+        try: pipe.probe()
+        except Exception as e:
+            print(f"[ERR] FTP Connection failed: {e}")
+            return None
+        return pipe
+
+    def _scan_games(self, pipe):
         search_paths = ["/data/homebrew", "/data/etaHEN/games", "/data/games"]
         for i in range(8): search_paths.extend([f"/mnt/usb{i}/homebrew", f"/mnt/usb{i}/etaHEN/games"])
         for i in range(8): search_paths.append(f"/mnt/ext{i}/homebrew")
+        if self.cfg['target_base_path'] not in search_paths: search_paths.insert(0, self.cfg['target_base_path'])
 
         found_games = []
         processed = set()
@@ -739,86 +1525,328 @@ class PS5SyncApp(ctk.CTk):
         print("[SCAN] Scanning storage...")
         for path in search_paths:
             try:
-                ftp.cwd(path)
-                items = ftp.nlst()
-                for item in items:
-                    if "." in item: continue
+                pipe.ftp.cwd(path)
+                items = [item for item in pipe.ftp.nlst() if "." not in item and f"{path}/{item}" not in processed]
+
+                # One pipelined pass for SIZE of every candidate, one for MDTM of the hits
+                param_paths = [f"{path}/{item}/sce_sys/param.json" for item in items]
+                hits = [(item, param_path, size) for item, param_path, size
+                        in zip(items, param_paths, pipe.sizes(param_paths)) if size is not None]
+                mdtms = pipe.mdtms([param_path for _, param_path, _ in hits])
+
+                for (item, _, param_size), param_mdtm in zip(hits, mdtms):
                     full_path = f"{path}/{item}"
-                    if full_path in processed: continue
-                    try:
-                        ftp.size(f"{full_path}/sce_sys/param.json")
-                        found_games.append((item, full_path))
-                        processed.add(full_path)
-                    except: pass
-            except: continue
+                    found_games.append((item, full_path))
+                    processed.add(full_path)
+                    self._catalog_game(pipe.ftp, item, full_path, param_size, param_mdtm)
+            except (ftplib.error_perm, ftplib.error_temp): continue # Missing or empty search path
         
         print(f"[SCAN] Found {len(found_games)} games.")
-        try: ftp.mkd(target_base)
-        except: pass
-        
-        for name, src_path in found_games:
-            print(f"Syncing: {name}...")
-            self._deploy_game(ftp, name, src_path, target_base)
-        
-        print("[DONE] Sync Complete.")
-        ftp.quit()
-        self._stop_sync_ui(success=True)
+        self.catalog.prune(processed)
+        self.catalog.save()
+        for title_id, paths in self.catalog.duplicates().items():
+            print(f"[CATALOG] Duplicate {title_id}: {', '.join(paths)}")
+        self.refresh_library()
+        return found_games
+
+    def _catalog_game(self, ftp, game_name, src_path, param_size, param_mdtm):
+        """Refreshes the catalog entry of a game, skipping unchanged param.json files."""
+        param_path = f"{src_path}/sce_sys/param.json"
+        if self.catalog.is_fresh(src_path, param_size, param_mdtm): return
+
+        try: info = parse_param_json(ftp_retrieve(ftp, param_path))
+        except: info = None
+
+        if not info:
+            print(f"[CATALOG] Could not parse {param_path}")
+            return
+        self.catalog.update(src_path, game_name, param_size, param_mdtm, info)
 
-    def _stop_sync_ui(self, success=False):
+    def _stop_sync_ui(self, success=False, message=None):
         self.progress.stop()
         self.progress.set(1)
         self.btn_sync.configure(state="normal", text="START GAME SYNC")
+        self.btn_dry_run.configure(state="normal")
+        self.btn_push.configure(state="normal")
         
-        if success:
+        if message:
+            self.lbl_sync_status.configure(text=message, text_color="#2CC985" if success else "red")
+        elif success:
             self.lbl_sync_status.configure(text="✔ Synchronizacja zakończona pomyślnie!", text_color="#2CC985")
         else:
             self.lbl_sync_status.configure(text="❌ Błąd synchronizacji (Sprawdź konsolę)", text_color="red")
 
-    def _deploy_game(self, ftp, game_name, src_path, target_base):
-        tgt_dir = f"{target_base}/{game_name}"
-        try: ftp.mkd(tgt_dir)
-        except: pass
+    # --- SYNC PLANNING ---
+    def _plan_sync(self, pipe, found_games, target_base):
+        """Builds the full SyncPlan using only read commands (NLST, SIZE, RETR)."""
+        plan = SyncPlan()
 
+        # Games with the same folder name on several drives share one shortcut dir; keep the first found
+        unique = {}
+        for name, src_path in found_games:
+            if name in unique: print(f"[PLAN] Skipping {src_path}: {target_base}/{name} is already used by {unique[name]}")
+            else: unique[name] = src_path
+        found_games = list(unique.items())
+        try: existing = {n.rsplit("/", 1)[-1] for n in pipe.ftp.nlst(target_base)}
+        except (ftplib.error_perm, ftplib.error_temp):
+            existing = set()
+            plan.mkdirs.append(target_base)
+
+        # Artwork of every game (shortcut and source side) is probed in one pipelined pass
+        art_paths = []
+        for name, src_path in found_games:
+            for img in ARTWORK_PROFILES:
+                if name in existing: art_paths.append(f"{target_base}/{name}/{img}")
+                art_paths.append(f"{src_path}/sce_sys/{img}")
+        art_sizes = dict(zip(art_paths, pipe.sizes(art_paths)))
+        optimize = self.cfg.get("optimize_artwork") and Image is not None
+        self.art_index = load_artwork_index() if optimize else {}
+
+        payload_size = os.path.getsize("dump_runner.elf")
+        for name, src_path in found_games:
+            plan.games.append((name, src_path))
+            tgt_dir = f"{target_base}/{name}"
+            if name not in existing: plan.mkdirs.append(tgt_dir)
+            self._plan_game(pipe.ftp, plan, src_path, tgt_dir, name in existing, payload_size, art_sizes, optimize)
+
+        # Shortcut dirs created by this tool whose source dump disappeared
+        game_names = {name for name, _ in found_games}
+        candidates = [f"{target_base}/{name}" for name in sorted(existing - game_names)]
+        markers = pipe.sizes([f"{d}/payload_version.json" for d in candidates])
+        tool_dirs = [d for d, size in zip(candidates, markers) if size is not None]
+        params = pipe.sizes([f"{d}/sce_sys/param.json" for d in tool_dirs])
+        plan.stale = [d for d, size in zip(tool_dirs, params) if size is None] # Skip real dumps living in the target dir
+        return plan
+
+    def _plan_game(self, ftp, plan, src_path, tgt_dir, tgt_exists, payload_size, art_sizes, optimize):
         remote_meta_path = f"{tgt_dir}/payload_version.json"
         remote_md5 = None
-        try:
-            bio = io.BytesIO()
-            ftp.retrbinary(f"RETR {remote_meta_path}", bio.write)
-            remote_md5 = json.loads(bio.getvalue().decode()).get("md5")
-        except: pass
+        remote_js = ""
+        if tgt_exists:
+            try: remote_md5 = json.loads(ftp_retrieve(ftp, remote_meta_path).decode()).get("md5")
+            except: pass
+            try: remote_js = ftp_retrieve(ftp, f"{tgt_dir}/homebrew.js").decode()
+            except: pass
 
         if remote_md5 != LOCAL_PAYLOAD_META["md5"]:
-            try:
-                with open("dump_runner.elf", "rb") as f:
-                    ftp.storbinary(f"STOR {tgt_dir}/dump_runner.elf", f)
-                m_json = json.dumps(LOCAL_PAYLOAD_META).encode()
-                ftp.storbinary(f"STOR {remote_meta_path}", io.BytesIO(m_json))
-                print("  -> Payload Updated")
-            except: pass
+            action = "update" if remote_md5 else "create"
+            m_json = json.dumps(LOCAL_PAYLOAD_META).encode()
+            plan.add_upload(f"{tgt_dir}/dump_runner.elf", payload_size, action, local="dump_runner.elf")
+            plan.add_upload(remote_meta_path, len(m_json), action, data=m_json, requires=f"{tgt_dir}/dump_runner.elf")
+        else:
+            plan.up_to_date.extend([f"{tgt_dir}/dump_runner.elf", remote_meta_path])
 
         js_code = JS_TEMPLATE.format(usb_path=src_path, tool_version=TOOL_VERSION)
-        remote_js = ""
-        try:
-            bio = io.BytesIO()
-            ftp.retrbinary(f"RETR {tgt_dir}/homebrew.js", bio.write)
-            remote_js = bio.getvalue().decode()
-        except: pass
-        
         if remote_js.strip() != js_code.strip():
-             ftp.storbinary(f"STOR {tgt_dir}/homebrew.js", io.BytesIO(js_code.encode()))
-             print("  -> JS Updated")
-
-        for img in ["icon0.png", "pic1.png", "pic0.png"]:
-            try:
-                if ftp.size(f"{tgt_dir}/{img}") > 0: continue
+            plan.add_upload(f"{tgt_dir}/homebrew.js", len(js_code.encode()), "update" if remote_js else "create", data=js_code.encode())
+        else:
+            plan.up_to_date.append(f"{tgt_dir}/homebrew.js")
+
+        for img in ARTWORK_PROFILES:
+            src = f"{src_path}/sce_sys/{img}"
+            src_size = art_sizes.get(src)
+            tgt_size = art_sizes.get(f"{tgt_dir}/{img}")
+            if src_size is None and not tgt_size: continue # Dump has no such artwork
+            if tgt_size and not (optimize and src_size is not None and self._needs_reoptimize(src, src_size, tgt_size)):
+                plan.up_to_date.append(f"{tgt_dir}/{img}")
+                continue
+            plan.add_upload(f"{tgt_dir}/{img}", src_size, "update" if tgt_size else "create", src=src)
+
+    def _needs_reoptimize(self, src, src_size, tgt_size):
+        """True if a deployed image doesn't match the optimized version of its source."""
+        expected = self.art_index.get(f"{src}|{src_size}")
+        if expected is None: return tgt_size == src_size
+        return tgt_size != expected
+
+    # --- SYNC EXECUTION ---
+    def _execute_plan(self, pipe, plan, prune_stale=False):
+        """Runs the plan batch by batch. Returns the number of files that could not be written."""
+        if plan.mkdirs:
+            print(f"[SYNC] Creating {len(plan.mkdirs)} directories...")
+            for path, reply in zip(plan.mkdirs, pipe.run([f"MKD {p}" for p in plan.mkdirs])):
+                if not reply.startswith("257"): print(f"  -> MKD {path}: {reply}")
+
+        optimize = self.cfg.get("optimize_artwork") and Image is not None
+        failed = set()
+        bytes_saved = 0
+        bytes_sent = 0
+        started = time.time()
+
+        for batch_name, uploads in plan.batches():
+            if not uploads: continue
+            print(f"[SYNC] Writing {len(uploads)} {batch_name}...")
+            for up in uploads:
+                if up["requires"] in failed:
+                    failed.add(up["path"])
+                    continue
+                try:
+                    sent, saved = self._run_upload(pipe.ftp, up, optimize)
+                    bytes_sent += sent
+                    bytes_saved += saved
+                except Exception as e:
+                    print(f"[ERR] {up['path']}: {e}")
+                    failed.add(up["path"])
+
+        elapsed = time.time() - started
+        if bytes_sent >= SMALL_FILE_LIMIT and elapsed > 0:
+            self.cfg["measured_bps"] = int(bytes_sent / elapsed)
+            save_config(self.cfg)
+        print(f"[SYNC] Wrote {len(plan.uploads) - len(failed)}/{len(plan.uploads)} files ({format_size(bytes_sent)}) in {elapsed:.1f}s.")
+        if optimize: save_artwork_index(self.art_index)
+        if bytes_saved: print(f"[ART] Artwork optimization saved {format_size(bytes_saved)}.")
+
+        if plan.stale and prune_stale:
+            print(f"[SYNC] Removing {len(plan.stale)} stale shortcuts...")
+            for tgt_dir in plan.stale: self._remove_shortcut(pipe.ftp, tgt_dir)
+        elif plan.stale:
+            print(f"[SYNC] {len(plan.stale)} stale shortcuts kept (enable 'Remove stale shortcuts' to delete them).")
+        return len(failed)
+
+    def _run_upload(self, ftp, up, optimize):
+        """Writes one planned file. Returns (bytes sent, bytes saved by artwork optimization)."""
+        if up["local"]:
+            with open(up["local"], "rb") as f:
+                ftp_store(ftp, up["path"], f)
+            return up["size"], 0
+
+        data = up["data"]
+        saved = 0
+        if up["src"]:
+            data = ftp_retrieve(ftp, up["src"])
+            if optimize:
+                optimized = optimize_artwork(up["path"].rsplit("/", 1)[-1], data)
+                saved = len(data) - len(optimized)
+                data = optimized
+                self.art_index[f"{up['src']}|{up['size']}"] = len(data)
+        ftp_store(ftp, up["path"], io.BytesIO(data))
+        return len(data), saved
+
+    def _remove_shortcut(self, ftp, tgt_dir):
+        for f in SHORTCUT_FILES:
+            try: ftp.delete(f"{tgt_dir}/{f}")
             except: pass
-            try:
-                bio = io.BytesIO()
-                ftp.retrbinary(f"RETR {src_path}/sce_sys/{img}", bio.write)
-                bio.seek(0)
-                ftp.storbinary(f"STOR {tgt_dir}/{img}", bio)
+        try:
+            ftp.rmd(tgt_dir)
+            print(f"  -> Removed {tgt_dir}")
+        except Exception as e:
+            print(f"  -> Kept {tgt_dir} (not empty: {e})")
+
+    # --- PUSH LIBRARY ---
+    def _logic_push(self, root):
+        print(f"\n--- PUSHING LIBRARY: {root} ---")
+        games = find_local_games(root)
+        for game_dir in [g for g in games if "." in os.path.basename(os.path.normpath(g))]:
+            # The game scan ignores folder names with dots, so no shortcut would ever be made
+            print(f"[PUSH] Skipping '{os.path.basename(os.path.normpath(game_dir))}': rename the folder without '.' to push it.")
+            games.remove(game_dir)
+        if not games:
+            print("[PUSH] No game folders (sce_sys/param.json) found.")
+            self._stop_sync_ui(success=False, message="No games found in selected folder")
+            return
+
+        pipe = self._open_pipeline()
+        if not pipe: self._stop_sync_ui(); return
+
+        target_base = self.cfg['target_base_path']
+        ip, port = pipe.ftp.host, pipe.ftp.port
+        workers = max(1, int(self.cfg.get("push_workers", 4)))
+        print(f"[PUSH] {len(games)} games, {workers} upload workers.")
+
+        all_ok = False
+        errors = 0
+        started = time.time()
+        bytes_sent = 0
+        local = threading.local()
+        conns = []
+        conns_lock = threading.Lock()
+        pool = ThreadPoolExecutor(max_workers=workers)
+
+        def upload(remote_path, filepath):
+            if getattr(local, "ftp", None) is None:
+                local.ftp = self._connect_ftp(ip, port)
+                if not local.ftp: raise ConnectionError("worker could not connect")
+                with conns_lock: conns.append(local.ftp)
+            try: return ftp_store_file(local.ftp, remote_path, filepath)
+            except Exception:
+                # The connection may be broken; the worker's next file reconnects
+                with conns_lock: conns.remove(local.ftp)
+                try: local.ftp.close()
+                except: pass
+                local.ftp = None
+                raise
+
+        try:
+            for game_dir in games:
+                name = os.path.basename(os.path.normpath(game_dir))
+                remote_dir = f"{target_base}/{name}"
+                uploads, manifest = self._plan_push_game(pipe, game_dir, remote_dir)
+                print(f"[PUSH] {name}: {len(uploads)} files to upload ({format_size(sum(u[1] for u in uploads))}), {len(manifest)} up to date.")
+
+                # Largest files first keeps all workers busy until the end
+                futures = {pool.submit(upload, f"{remote_dir}/{rel}", os.path.join(game_dir, rel)): (rel, size, mtime)
+                           for rel, size, mtime in sorted(uploads, key=lambda u: -u[1])}
+                pending = set(futures)
+                while pending:
+                    done, pending = wait(pending, timeout=PUSH_KEEPALIVE)
+                    if pending: pipe.keepalive() # The control connection idles while workers upload
+                    for fut in done:
+                        rel, size, mtime = futures[fut]
+                        try:
+                            md5 = fut.result()
+                            manifest[rel] = {"size": size, "mtime": mtime, "md5": md5}
+                            bytes_sent += size
+                        except Exception as e:
+                            print(f"[PUSH ERR] {rel}: {e}")
+                            errors += 1
+
+                pipe.keepalive()
+                ftp_store(pipe.ftp, f"{remote_dir}/{PUSH_MANIFEST}", io.BytesIO(json.dumps(manifest).encode()))
+            all_ok = errors == 0
+        except Exception as e:
+            print(f"[PUSH ERR] Push aborted: {e}")
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            for conn in conns:
+                try: conn.quit()
+                except: pass
+            try: pipe.ftp.quit()
             except: pass
 
+        elapsed = time.time() - started
+        print(f"[PUSH] Uploaded {format_size(bytes_sent)} in {elapsed:.1f}s ({format_size(bytes_sent / max(elapsed, 0.001))}/s).")
+        if not all_ok:
+            self._stop_sync_ui(success=False, message="Push finished with errors (check console)")
+            return
+
+        # Deploy shortcuts/JS/payload for the pushed games like a normal sync
+        self.btn_sync.configure(text="SYNCING...")
+        self._logic_sync()
+
+    def _plan_push_game(self, pipe, game_dir, remote_dir):
+        """Returns (files to upload, manifest of files already matching on the console)."""
+        files = list_local_files(game_dir)
+        try: remote_manifest = json.loads(ftp_retrieve(pipe.ftp, f"{remote_dir}/{PUSH_MANIFEST}").decode())
+        except: remote_manifest = {}
+
+        dirs = {remote_dir}
+        for rel, _, _ in files:
+            parts = rel.split("/")[:-1]
+            dirs.update(f"{remote_dir}/{'/'.join(parts[:i])}" for i in range(1, len(parts) + 1))
+        dirs = sorted(dirs) # Parents sort before their children
+        pipe.run([f"MKD {d}" for d in [self.cfg['target_base_path']] + dirs]) # Existing dirs just reply 550
+
+        remote_sizes = pipe.sizes([f"{remote_dir}/{rel}" for rel, _, _ in files])
+        uploads, manifest = [], {}
+        for (rel, size, mtime), remote_size in zip(files, remote_sizes):
+            known = remote_manifest.get(rel, {})
+            if remote_size == size and known.get("size") == size:
+                md5 = known.get("md5") if known.get("mtime") == mtime else calculate_mmap_md5(os.path.join(game_dir, rel))
+                if md5 == known.get("md5"):
+                    manifest[rel] = {"size": size, "mtime": mtime, "md5": md5}
+                    continue
+            uploads.append((rel, size, mtime))
+        return uploads, manifest
+
 if __name__ == "__main__":
     app = PS5SyncApp()
     app.mainloop()
\ No newline at end of file